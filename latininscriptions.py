@@ -1,5 +1,18 @@
+import hashlib
+import os
+from pathlib import Path
+
 import streamlit as st
 import pandas as pd
+import numpy as np
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.parquet as pq
+except ImportError:
+    # Optional, the app falls back to pandas' own string methods and skips the Parquet copy
+    pa = pc = pq = None
 
 # Configure the page
 st.set_page_config(
@@ -16,8 +29,40 @@ st.markdown("---")
 st.sidebar.title("📋 Navigation")
 page = st.sidebar.radio("Choose a page:", ["🏠 Overview", "🔍 Search", "📊 Statistics"])
 
+# Columns matched by the Search page
+SEARCH_COLUMNS = ("name",)
+
+# Low-cardinality columns stored as categoricals
+CATEGORY_COLUMNS = ("gender", "age_category", "case", "inscription_type")
+CATEGORY_DTYPES = dict.fromkeys(CATEGORY_COLUMNS, "category")
+
+# How many parsed datasets (the on-disk CSV plus recent uploads) stay in memory
+CACHED_DATASETS = 3
+
+def lowercase_columns(data):
+    """Lower-cased copies of the searchable columns, so searches don't case-fold on every rerun"""
+    # Keep the copies Arrow-backed when possible so contains() can scan them natively
+    string_dtype = "string[pyarrow]" if pa is not None else "string"
+    return {
+        col: data[col].astype(string_dtype).str.lower()
+        for col in SEARCH_COLUMNS if col in data.columns
+    }
+
+def dataset_key(name, data):
+    """Stable token for a loaded dataset: its source name plus a hash of its contents"""
+    digest = hashlib.sha1(pd.util.hash_pandas_object(data).to_numpy().tobytes()).hexdigest()
+    return f"{name}:{digest}"
+
+def contains(column, needle):
+    """Boolean mask of the rows of a lower-cased search column containing needle literally"""
+    if pc is not None and getattr(column.dtype, "storage", None) == "pyarrow":
+        # One vectorised pyarrow scan over the whole column
+        matches = pc.match_substring(pa.array(column.array), needle)
+        return np.asarray(pc.fill_null(matches, False))
+    return column.str.contains(needle, regex=False, na=False).to_numpy(dtype=bool)
+
 # Sample data creator (replace this with your real data later)
-@st.cache_data
+@st.cache_resource
 def load_sample_data():
     """Creates sample data - replace this with your actual data loading"""
     data = {
@@ -31,16 +76,88 @@ def load_sample_data():
         'case': ['Nominative', 'Genitive', 'Accusative', 'Dative', 'Nominative', 'Ablative', 'Nominative', 'Genitive', 'Dative', 'Nominative'],
         'inscription_type': ['Funerary', 'Honorary', 'Votive', 'Funerary', 'Building', 'Funerary', 'Military', 'Honorary', 'Votive', 'Funerary']
     }
-    return pd.DataFrame(data)
+    data = pd.DataFrame(data).astype(CATEGORY_DTYPES)
+    return data, lowercase_columns(data), dataset_key("sample", data)
+
+# Failures of the pyarrow CSV engine that the C engine may still handle
+PYARROW_CSV_ERRORS = (ImportError, pd.errors.ParserError)
+if pa is not None:
+    PYARROW_CSV_ERRORS += (pa.ArrowInvalid,)
+
+def parse_csv(source):
+    """Parses an inscriptions CSV, preferring the pyarrow engine"""
+    # Columns missing from the file are skipped by read_csv
+    try:
+        # Arrow's multi-threaded reader, keeping columns Arrow-backed
+        return pd.read_csv(source, dtype=CATEGORY_DTYPES,
+                           engine="pyarrow", dtype_backend="pyarrow")
+    except PYARROW_CSV_ERRORS:
+        # pyarrow isn't installed or is stricter than the C engine about this
+        # file (e.g. a short row), so fall back to the default C engine
+        if hasattr(source, "seek"):
+            source.seek(0)
+        return pd.read_csv(source, dtype=CATEGORY_DTYPES)
+
+# Parquet metadata key holding the size and mtime of the CSV a copy was made from
+CSV_SIGNATURE_KEY = b"inscriptions_csv_signature"
+
+def csv_signature(csv_path):
+    """The CSV's size and nanosecond mtime, used to tell whether its Parquet copy is current"""
+    stat = csv_path.stat()
+    return f"{stat.st_size}:{stat.st_mtime_ns}".encode()
+
+def load_csv_via_parquet(path):
+    """Reads a CSV from disk through a sibling Parquet copy, written on first load"""
+    csv_path = Path(path)
+    parquet_path = csv_path.with_suffix(".parquet")
+    # Stat the CSV up front so a missing file still raises
+    signature = csv_signature(csv_path)
+    if pq is None:
+        return parse_csv(csv_path)
+    
+    # Only trust the Parquet copy if it was made from exactly this CSV
+    if parquet_path.exists():
+        try:
+            metadata = pq.read_schema(parquet_path).metadata or {}
+        except Exception:
+            metadata = {}
+        if metadata.get(CSV_SIGNATURE_KEY) == signature:
+            return pq.read_table(parquet_path).to_pandas()
+    
+    data = parse_csv(csv_path)
+    # Write to a temporary file so a failed write never leaves a broken copy
+    tmp_path = parquet_path.with_suffix(".parquet.tmp")
+    try:
+        table = pa.Table.from_pandas(data)
+        table = table.replace_schema_metadata(
+            {**(table.schema.metadata or {}), CSV_SIGNATURE_KEY: signature}
+        )
+        pq.write_table(table, tmp_path, compression="snappy")
+        os.replace(tmp_path, parquet_path)
+    except Exception:
+        # The Parquet copy is only a cache, the CSV stays the source of truth
+        tmp_path.unlink(missing_ok=True)
+    return data
+
+@st.cache_resource(max_entries=CACHED_DATASETS)
+def load_data(source):
+    """Reads an inscriptions CSV (path or uploaded file) with its lower-cased search columns and dataset key"""
+    if isinstance(source, (str, Path)):
+        data = load_csv_via_parquet(source)
+        name = str(source)
+    else:
+        data = parse_csv(source)
+        name = source.name
+    return data, lowercase_columns(data), dataset_key(name, data)
 
 # Load data
 try:
     # Try to load your real data first
-    data = pd.read_csv("inscriptions_data.csv")
+    data, lowered, key = load_data("inscriptions_data.csv")
     st.sidebar.success("✅ Real data loaded!")
 except:
     # If it fails, use sample data
-    data = load_sample_data()
+    data, lowered, key = load_sample_data()
     st.sidebar.warning("⚠️ Using sample data. Upload your CSV to see real data.")
 
 # File uploader in sidebar
@@ -48,14 +165,84 @@ st.sidebar.markdown("---")
 st.sidebar.subheader("📁 Upload Your Data")
 uploaded_file = st.sidebar.file_uploader("Choose a CSV file", type="csv")
 if uploaded_file is not None:
-    data = pd.read_csv(uploaded_file)
+    data, lowered, key = load_data(uploaded_file)
     st.sidebar.success("✅ File uploaded successfully!")
 
+# The helpers below take the frame unhashed (leading underscore) and key their
+# caches on the dataset key returned by the loaders instead
+@st.cache_data(max_entries=CACHED_DATASETS)
+def summary(_data, key):
+    """Counts and year bounds shown on the Overview and Statistics pages"""
+    return {
+        "unique_people": _data['person_id'].nunique(),
+        "gender": _data['gender'].value_counts(),
+        "age": _data['age_category'].value_counts(),
+        "case": _data['case'].value_counts(),
+        "type": _data['inscription_type'].value_counts(),
+        "year_min": _data['year'].min(),
+        "year_max": _data['year'].max(),
+    }
+
+@st.cache_data(max_entries=CACHED_DATASETS)
+def static_labels(_data, key):
+    """Metric and info strings that only change when the dataset does"""
+    stats = summary(_data, key)
+    return {
+        "total": f"{len(_data):,}",
+        "earliest": f"**Earliest Year:** {stats['year_min']}",
+        "latest": f"**Latest Year:** {stats['year_max']}",
+        "year_range": f"**Year Range:** {stats['year_max'] - stats['year_min']} years",
+    }
+
+# Above this many distinct years the timeline is pre-binned instead of drawing one bar per year
+MAX_TIMELINE_BARS = 800
+
+@st.cache_data(max_entries=CACHED_DATASETS)
+def year_histogram(_data, key):
+    """Inscription counts per year for the Overview timeline"""
+    if not pd.api.types.is_integer_dtype(_data['year']):
+        # Float or free-text years (e.g. "c. 150") can't be binned as integers
+        return _data['year'].value_counts().sort_index()
+    years = _data['year'].dropna().to_numpy(dtype=np.int32)
+    if len(years) == 0:
+        return pd.Series(dtype="int64", name="count")
+    low, high = years.min(), years.max()
+    # Whole years per bar: 1 unless the span needs more than MAX_TIMELINE_BARS bars
+    width = -(-(high - low + 1) // MAX_TIMELINE_BARS)
+    counts = np.bincount((years - low) // width)
+    # Each bar is labelled with its first year
+    index = pd.Index(low + width * np.arange(len(counts)), name="year")
+    # Drop empty bars to match the chart value_counts() used to produce
+    return pd.Series(counts, index=index, name="count")[counts > 0]
+
+@st.cache_data(max_entries=CACHED_DATASETS)
+def recent_inscriptions(_data, key):
+    """The ten latest inscriptions, pre-converted to Arrow so reruns skip the conversion"""
+    if pd.api.types.is_numeric_dtype(_data['year']):
+        recent = _data.nlargest(10, 'year')
+        if len(recent) < 10:
+            # nlargest skips missing years; sort_values listed them last, so do the same
+            undated = _data[_data['year'].isna()].head(10 - len(recent))
+            recent = pd.concat([recent, undated])
+    else:
+        # nlargest only handles numeric columns
+        recent = _data.sort_values('year', ascending=False).head(10)
+    if pa is None:
+        return recent
+    return pa.Table.from_pandas(recent, preserve_index=False)
+
+# Each entry holds a full CSV copy of a result set, so only keep a few
+@st.cache_data(max_entries=8)
+def to_csv_bytes(_df, key, name_search, gender_filter, age_filter):
+    """CSV payload for the Search download button, keyed on the dataset and the filters that produced it"""
+    return _df.to_csv(index=False).encode()
+
 # ========================================
 # OVERVIEW PAGE
 # ========================================
 if page == "🏠 Overview":
     st.header("Overview")
+    stats = summary(data, key)
     
     # Metrics in columns
     col1, col2, col3, col4 = st.columns(4)
@@ -63,32 +250,32 @@ if page == "🏠 Overview":
     with col1:
         st.metric(
             label="📚 Total Inscriptions",
-            value=len(data)
+            value=static_labels(data, key)["total"]
         )
     
     with col2:
         st.metric(
             label="👥 Unique People",
-            value=data['person_id'].nunique()
+            value=stats["unique_people"]
         )
     
     with col3:
         st.metric(
             label="👨 Male",
-            value=len(data[data['gender'] == 'Male'])
+            value=stats["gender"].get('Male', 0)
         )
     
     with col4:
         st.metric(
             label="👩 Female",
-            value=len(data[data['gender'] == 'Female'])
+            value=stats["gender"].get('Female', 0)
         )
     
     st.markdown("---")
     
     # Timeline (simple bar chart)
     st.subheader("📅 Inscriptions Over Time")
-    year_counts = data['year'].value_counts().sort_index()
+    year_counts = year_histogram(data, key)
     st.bar_chart(year_counts)
     
     st.markdown("---")
@@ -96,7 +283,7 @@ if page == "🏠 Overview":
     # Recent inscriptions table
     st.subheader("🆕 Recent Inscriptions")
     st.dataframe(
-        data.sort_values('year', ascending=False).head(10),
+        recent_inscriptions(data, key),
         use_container_width=True,
         hide_index=True
     )
@@ -118,21 +305,26 @@ elif page == "🔍 Search":
     
     with col3:
         age_filter = st.selectbox("👶 Age Category:", 
-                                  ["All"] + list(data['age_category'].unique()))
-    
-    # Apply filters
-    filtered_data = data.copy()
-    
-    if name_search:
-        filtered_data = filtered_data[
-            filtered_data['name'].str.contains(name_search, case=False, na=False)
-        ]
+                                  ["All"] + data['age_category'].cat.categories.tolist())
     
-    if gender_filter != "All":
-        filtered_data = filtered_data[filtered_data['gender'] == gender_filter]
-    
-    if age_filter != "All":
-        filtered_data = filtered_data[filtered_data['age_category'] == age_filter]
+    # Apply filters as a single mask so the frame is indexed at most once
+    if not name_search and gender_filter == "All" and age_filter == "All":
+        # Nothing to filter, show the loaded frame as is
+        filtered_data = data
+    else:
+        mask = pd.Series(True, index=data.index)
+        
+        if name_search:
+            needle = name_search.lower()
+            mask &= contains(lowered['name'], needle)
+        
+        if gender_filter != "All":
+            mask &= data['gender'].eq(gender_filter)
+        
+        if age_filter != "All":
+            mask &= data['age_category'].eq(age_filter)
+        
+        filtered_data = data if mask.all() else data.loc[mask]
     
     # Display results
     st.markdown("---")
@@ -146,7 +338,7 @@ elif page == "🔍 Search":
         )
         
         # Download button
-        csv = filtered_data.to_csv(index=False)
+        csv = to_csv_bytes(filtered_data, key, name_search, gender_filter, age_filter)
         st.download_button(
             label="📥 Download Results as CSV",
             data=csv,
@@ -161,10 +353,11 @@ elif page == "🔍 Search":
 # ========================================
 elif page == "📊 Statistics":
     st.header("Statistics & Analysis")
+    stats = summary(data, key)
     
     # Gender distribution
     st.subheader("⚥ Gender Distribution")
-    gender_counts = data['gender'].value_counts()
+    gender_counts = stats["gender"]
     st.bar_chart(gender_counts)
     
     col1, col2 = st.columns(2)
@@ -177,35 +370,36 @@ elif page == "📊 Statistics":
     
     # Age category distribution
     st.subheader("👶 Age Categories")
-    age_counts = data['age_category'].value_counts()
+    age_counts = stats["age"]
     st.bar_chart(age_counts)
     
     st.markdown("---")
     
     # Inscription types
     st.subheader("📜 Inscription Types")
-    type_counts = data['inscription_type'].value_counts()
+    type_counts = stats["type"]
     st.bar_chart(type_counts)
     
     st.markdown("---")
     
     # Grammatical case distribution
     st.subheader("📖 Grammatical Cases")
-    case_counts = data['case'].value_counts()
+    case_counts = stats["case"]
     st.bar_chart(case_counts)
     
     st.markdown("---")
     
     # Summary statistics
     st.subheader("📈 Summary Statistics")
+    labels = static_labels(data, key)
     col1, col2, col3 = st.columns(3)
     
     with col1:
-        st.info(f"**Earliest Year:** {data['year'].min()}")
+        st.info(labels["earliest"])
     with col2:
-        st.info(f"**Latest Year:** {data['year'].max()}")
+        st.info(labels["latest"])
     with col3:
-        st.info(f"**Year Range:** {data['year'].max() - data['year'].min()} years")
+        st.info(labels["year_range"])
 
 # Footer
 st.markdown("---")